@@ -5,17 +5,22 @@ Generates funscript files from video scenes using optical flow analysis
 
 from __future__ import annotations
 
+import asyncio
+import functools
 import gc
 import os
+import re
 import sys
 import json
 import math
 import threading
+import time
+import collections
 import concurrent.futures
 import random
 import subprocess
 from multiprocessing import Pool
-from typing import Dict, Any, List, Optional, Callable, Tuple
+from typing import Dict, Any, Awaitable, Iterable, Iterator, List, NamedTuple, Optional, Callable, Set, Tuple
 
 # Hardware acceleration will be tried first, then fallback to software decoding if needed
 # We don't set these initially to allow hardware acceleration to be attempted
@@ -103,10 +108,12 @@ def init_dependencies() -> Optional[str]:
 # ----------------- Global Variables -----------------
 
 stash: Optional[StashInterface] = None
-progress: float = 0.0
+progress: float = 0.0  # Last progress value sent to Stash
 total_tasks: int = 0
 completed_tasks: int = 0
 PLUGIN_DIR: Optional[str] = None
+# Resolved at import, before run() changes the working directory
+SCRIPT_PATH: str = os.path.abspath(__file__)
 
 # ----------------- Optical Flow Functions -----------------
 
@@ -444,10 +451,12 @@ def probe_video_streams(video_path: str) -> Tuple[bool, Optional[int], Optional[
             "-of", "json",
             video_path
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+        # Bytes mode: json.loads reads bytes directly and stderr is only decoded on failure
+        result = subprocess.run(cmd, capture_output=True, timeout=10)
         
         if result.returncode != 0:
-            return False, None, f"ffprobe failed: {result.stderr}"
+            err = result.stderr[-4096:].decode("utf-8", "replace").strip()
+            return False, None, f"ffprobe failed: {err}"
         
         data = json.loads(result.stdout)
         streams = data.get("streams", [])
@@ -1503,81 +1512,212 @@ def process_video(video_path: str, params: Dict[str, Any], log_func: Callable,
 
 # ----------------- StashApp Integration -----------------
 
+def _is_transient_error(e: Exception) -> bool:
+    """Check if a Stash request failed in a way that is worth retrying."""
+    import requests
+
+    # Only dropped connections and timeouts; SSL, URL and schema errors are
+    # configuration problems that a retry cannot fix (SSLError subclasses ConnectionError)
+    if isinstance(e, requests.exceptions.SSLError):
+        return False
+    if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    # stashapi raises "<status> <reason> query failed." for bad responses
+    return bool(re.match(r"5\d\d ", str(e)))
+
+
+def _retry(max_attempts: int = 4, base: float = 0.5) -> Callable:
+    """Retry a Stash call with exponential backoff (base * 2**n) on transient errors."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(max_attempts):
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    if attempt == max_attempts - 1 or not _is_transient_error(e):
+                        raise
+                    delay = base * 2 ** attempt
+                    log.warning(f"{func.__name__} failed ({e}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+        return wrapper
+    return decorator
+
+
+# Scene fields fetched for processing: the id for updates, the file path to
+# process and tag names for VR detection. Keep this minimal - every extra field
+# (fingerprints, markers, performers, ...) is resolved server-side for every
+# scene of every page, and some of them fail on older databases.
+SCENE_FRAGMENT = "id files { path } tags { name }"
+
+
 def initialize_stash(connection: Dict[str, Any]) -> None:
     """Initialize the StashApp interface."""
-    global stash
+    global stash, _plugin_settings
     stash = StashInterface(connection)
+    _tag_id_cache.clear()
+    _plugin_settings = None
 
 
-def get_scenes_with_tag(tag_name: str) -> List[Dict[str, Any]]:
-    """Get all scenes that have a specific tag."""
-    tag = stash.find_tag(tag_name, create=False)
-    if not tag:
-        log.warning(f"Tag '{tag_name}' not found")
-        return []
-    
+# Tag name -> tag ID, filled by resolve_tag_ids for the lifetime of one run
+_tag_id_cache: Dict[str, str] = {}
+
+
+@_retry()
+def resolve_tag_ids(tag_names: List[str], create: bool = False) -> Dict[str, str]:
+    """
+    Resolve several tag names to IDs with a single GraphQL request.
+    Each name becomes an aliased findTags lookup; names that do not match exactly
+    fall back to find_tag (alias matching, optional creation).
+    """
+    names = [n for n in dict.fromkeys(tag_names) if n and n not in _tag_id_cache]
+    if names:
+        var_defs = ", ".join(f"$n{i}: String!" for i in range(len(names)))
+        lookups = " ".join(
+            f"t{i}: findTags(tag_filter: {{name: {{value: $n{i}, modifier: EQUALS}}}}, "
+            f"filter: {{per_page: 1}}) {{ tags {{ id }} }}"
+            for i in range(len(names))
+        )
+        result = stash.call_GQL(
+            f"query FindTagIds({var_defs}) {{ {lookups} }}",
+            {f"n{i}": name for i, name in enumerate(names)},
+        )
+        for i, name in enumerate(names):
+            tags = (result.get(f"t{i}") or {}).get("tags") or []
+            if tags:
+                _tag_id_cache[name] = tags[0]["id"]
+
+    for name in dict.fromkeys(tag_names):
+        if name and name not in _tag_id_cache:
+            tag = stash.find_tag(name, create=create)
+            if tag:
+                _tag_id_cache[name] = tag["id"]
+
+    return {n: _tag_id_cache[n] for n in tag_names if n in _tag_id_cache}
+
+
+def get_tag_id(tag_name: str, create: bool = False) -> Optional[str]:
+    """Get a tag ID by name, using the per-run tag cache."""
+    return resolve_tag_ids([tag_name], create=create).get(tag_name)
+
+
+@_retry()
+def _find_scenes_with_tag_id(tag_id: str) -> List[Dict[str, Any]]:
     # Use fragment to limit fields and avoid fingerprint errors
-    # Only fetch id, files.path, and tags.id/name - avoiding problematic fragments
     scenes = stash.find_scenes(
-        f={"tags": {"value": [tag["id"]], "modifier": "INCLUDES"}},
+        f={"tags": {"value": [tag_id], "modifier": "INCLUDES"}},
         filter={"per_page": -1},
-        fragment="id files { path } tags { id name }"
+        fragment=SCENE_FRAGMENT
     )
     return scenes or []
 
 
-def get_all_scenes() -> List[Dict[str, Any]]:
-    """Get all scenes in the library."""
-    scenes = stash.find_scenes(
-        f={},
-        filter={"per_page": -1},
-        fragment="id files { path } tags { id name }"
+def get_scenes_with_tag(tag_name: str) -> List[Dict[str, Any]]:
+    """Get all scenes that have a specific tag."""
+    # Both lookups retry on their own; don't retry here as well
+    tag_id = get_tag_id(tag_name, create=False)
+    if not tag_id:
+        log.warning(f"Tag '{tag_name}' not found")
+        return []
+    
+    return _find_scenes_with_tag_id(tag_id)
+
+
+# Scenes fetched per GraphQL page when walking the whole library
+SCENE_PAGE_SIZE = 200
+
+
+@_retry()
+def _find_scenes_page(
+    after_id: Optional[int],
+    page_size: int,
+    scene_filter: Dict[str, Any],
+) -> Tuple[int, List[Dict[str, Any]]]:
+    # Keyset paging: always page 1 of the scenes after the last ID seen, so
+    # scenes leaving the filter mid-run cannot shift later pages
+    f = dict(scene_filter)
+    if after_id is not None:
+        f["id"] = {"value": after_id, "modifier": "GREATER_THAN"}
+    count, scenes = stash.find_scenes(
+        f=f,
+        filter={"per_page": page_size, "page": 1, "sort": "id", "direction": "ASC"},
+        fragment=SCENE_FRAGMENT,
+        get_count=True,
     )
-    return scenes or []
+    return count, scenes or []
+
+
+def get_all_scenes(
+    page_size: int = SCENE_PAGE_SIZE,
+    scene_filter: Optional[Dict[str, Any]] = None,
+) -> Tuple[int, Iterator[Dict[str, Any]]]:
+    """
+    Get all scenes in the library, optionally narrowed by a SceneFilterType.
+    Returns (count, scenes) where scenes is an iterator that fetches one page at a
+    time, so only a single page of the library is held in memory at once.
+    """
+    scene_filter = scene_filter or {}
+    count, first_page = _find_scenes_page(None, page_size, scene_filter)
+
+    def iter_pages() -> Iterator[Dict[str, Any]]:
+        page = first_page
+        while page:
+            yield from page
+            if len(page) < page_size:
+                return
+            page = _find_scenes_page(int(page[-1]["id"]), page_size, scene_filter)[1]
+
+    return count, iter_pages()
+
+
+@_retry()
+def update_scene_tags(
+    scene_id: str,
+    add_tag_ids: Optional[List[str]] = None,
+    remove_tag_ids: Optional[List[str]] = None,
+) -> None:
+    """
+    Add and remove scene tags in a single GraphQL request.
+    Uses aliased bulkSceneUpdate mutations in ADD/REMOVE mode, so the scene's
+    current tags never need to be fetched first.
+    """
+    inputs = {}
+    if add_tag_ids:
+        inputs["add"] = {"ids": [scene_id], "tag_ids": {"ids": list(add_tag_ids), "mode": "ADD"}}
+    if remove_tag_ids:
+        inputs["remove"] = {"ids": [scene_id], "tag_ids": {"ids": list(remove_tag_ids), "mode": "REMOVE"}}
+    if not inputs:
+        return
+
+    var_defs = ", ".join(f"${key}: BulkSceneUpdateInput!" for key in inputs)
+    updates = " ".join(f"{key}: bulkSceneUpdate(input: ${key}) {{ id }}" for key in inputs)
+    stash.call_GQL(f"mutation UpdateSceneTags({var_defs}) {{ {updates} }}", inputs)
 
 
 def remove_tag_from_scene(scene_id: str, tag_name: str) -> None:
     """Remove a tag from a scene."""
-    tag = stash.find_tag(tag_name, create=False)
-    if not tag:
-        return
-    
-    # Use fragment to limit fields and avoid fingerprint errors
-    scene = stash.find_scene(scene_id, fragment="id tags { id }")
-    if not scene:
-        return
-    
-    current_tags = [t["id"] for t in scene.get("tags", [])]
-    if tag["id"] in current_tags:
-        current_tags.remove(tag["id"])
-        stash.update_scene({"id": scene_id, "tag_ids": current_tags})
+    tag_id = get_tag_id(tag_name, create=False)
+    if tag_id:
+        update_scene_tags(scene_id, remove_tag_ids=[tag_id])
 
 
 def add_tag_to_scene(scene_id: str, tag_name: str) -> None:
     """Add a tag to a scene."""
-    tag = stash.find_tag(tag_name, create=True)
-    if not tag:
-        return
-    
-    # Use fragment to limit fields and avoid fingerprint errors
-    scene = stash.find_scene(scene_id, fragment="id tags { id }")
-    if not scene:
-        return
-    
-    current_tags = [t["id"] for t in scene.get("tags", [])]
-    if tag["id"] not in current_tags:
-        current_tags.append(tag["id"])
-        stash.update_scene({"id": scene_id, "tag_ids": current_tags})
+    tag_id = get_tag_id(tag_name, create=True)
+    if tag_id:
+        update_scene_tags(scene_id, add_tag_ids=[tag_id])
+
+
+@functools.lru_cache(maxsize=None)
+def _vr_tag_names() -> frozenset:
+    vr_tag_names = config.vr_tag_names if hasattr(config, 'vr_tag_names') else ["VR", "Virtual Reality"]
+    return frozenset(t.lower() for t in vr_tag_names)
 
 
 def is_vr_scene(scene: Dict[str, Any]) -> bool:
     """Check if a scene is tagged as VR."""
-    tags = scene.get("tags", [])
-    vr_tag_names = config.vr_tag_names if hasattr(config, 'vr_tag_names') else ["VR", "Virtual Reality"]
-    for tag in tags:
-        if tag.get("name", "").lower() in [t.lower() for t in vr_tag_names]:
-            return True
-    return False
+    vr_tag_names = _vr_tag_names()
+    return any(tag.get("name", "").lower() in vr_tag_names for tag in scene.get("tags", []))
 
 
 def add_scene_marker(scene_id: str, title: str, seconds: float, tag_name: Optional[str] = None) -> None:
@@ -1589,9 +1729,9 @@ def add_scene_marker(scene_id: str, title: str, seconds: float, tag_name: Option
     }
     
     if tag_name:
-        tag = stash.find_tag(tag_name, create=True)
-        if tag:
-            marker_data["primary_tag_id"] = tag["id"]
+        tag_id = get_tag_id(tag_name, create=True)
+        if tag_id:
+            marker_data["primary_tag_id"] = tag_id
     
     stash.create_scene_marker(marker_data)
 
@@ -1606,14 +1746,23 @@ def get_scene_file_path(scene: Dict[str, Any]) -> Optional[str]:
 
 # ----------------- Settings Helper -----------------
 
+# Plugin settings from StashApp, fetched once per run by get_plugin_setting
+_plugin_settings: Optional[Dict[str, Any]] = None
+
+
 def get_plugin_setting(key: str, default: Any = None) -> Any:
     """Get a plugin setting from StashApp, falling back to config file."""
-    try:
-        settings = stash.get_configuration().get("plugins", {}).get("funscript_generator", {})
-        if key in settings and settings[key] is not None:
-            return settings[key]
-    except Exception:
-        pass
+    global _plugin_settings
+    if _plugin_settings is None:
+        try:
+            # Only select the plugins map instead of the whole configuration
+            configuration = stash.get_configuration(fragment="plugins")
+            _plugin_settings = (configuration.get("plugins") or {}).get("funscript_generator") or {}
+        except Exception:
+            return getattr(config, key, default)
+
+    if key in _plugin_settings and _plugin_settings[key] is not None:
+        return _plugin_settings[key]
     
     # Fall back to config file
     return getattr(config, key, default)
@@ -1637,109 +1786,349 @@ def get_error_tag() -> str:
 
 # ----------------- Task Functions -----------------
 
-def process_scenes(
-    scenes: List[Dict[str, Any]],
-    overwrite_override: Optional[bool] = None,
-    trigger_tag: Optional[str] = None,
-) -> None:
-    """Process a list of scenes."""
-    global total_tasks, completed_tasks
+# Smallest change in overall progress worth sending to Stash
+PROGRESS_STEP = 0.01
 
-    if not scenes:
-        log.info("No scenes found to process")
-        return
 
-    total_tasks = len(scenes)
-    completed_tasks = 0
-    log.info(f"Found {total_tasks} scenes to process")
-    log.progress(0.0)
+def report_progress(value: float) -> None:
+    """
+    Send overall task progress to Stash.
+    Each update is a flushed stderr write, so updates smaller than PROGRESS_STEP
+    are dropped; the start (0.0) and end (1.0) are always sent.
+    """
+    global progress
+    if value in (0.0, 1.0) or abs(value - progress) >= PROGRESS_STEP:
+        progress = value
+        log.progress(value)
 
-    for scene in scenes:
-        scene_id = scene["id"]
-        video_path = get_scene_file_path(scene)
 
-        if not video_path:
-            log.error(f"No file path for scene {scene_id}")
-            completed_tasks += 1
-            continue
+class SceneTask(NamedTuple):
+    """Per-scene values resolved once before processing."""
+    scene_id: str
+    video_path: str
+    funscript_path: str
+    vr_mode: bool
 
-        if not os.path.exists(video_path):
-            log.error(f"Video file not found: {video_path}")
-            completed_tasks += 1
-            continue
 
-        # Build processing parameters from plugin settings (with config file fallback)
-        # Convert 0-10 integer settings to their actual decimal values
-        detrend_window_raw = get_plugin_setting('detrend_window', 2)  # Default: 2 (was 1.5)
-        norm_window_raw = get_plugin_setting('norm_window', 4)  # Default: 4 (was 4.0)
-        multi_axis_intensity_raw = get_plugin_setting('multi_axis_intensity', 5)  # Default: 5 (was 0.5, scale 0-10)
-        random_speed_raw = get_plugin_setting('random_speed', 3)  # Default: 3 (was 0.3, scale 0-10)
-        auto_home_delay_raw = get_plugin_setting('auto_home_delay', 1)  # Default: 1 (was 1.0)
-        auto_home_duration_raw = get_plugin_setting('auto_home_duration', 1)  # Default: 1 (was 0.5, rounded)
-
-        overwrite_flag = bool(get_plugin_setting('overwrite', False)) if overwrite_override is None else bool(overwrite_override)
-
-        params = {
-            "threads": int(get_plugin_setting('threads', os.cpu_count() or 4)),
-            "detrend_window": float(max(1, min(10, int(detrend_window_raw)))),  # Clamp to 1-10 seconds
-            "norm_window": float(max(1, min(10, int(norm_window_raw)))),  # Clamp to 1-10 seconds
-            "batch_size": int(get_plugin_setting('batch_size', 3000)),
-            "overwrite": overwrite_flag,
-            "keyframe_reduction": bool(get_plugin_setting('keyframe_reduction', True)),
-            "vr_mode": is_vr_scene(scene),
-            "pov_mode": bool(get_plugin_setting('pov_mode', False)),
-            "balance_global": bool(get_plugin_setting('balance_global', True)),
-            "multi_axis": bool(get_plugin_setting('multi_axis', False)),
-            "multi_axis_intensity": float(max(0, min(10, int(multi_axis_intensity_raw))) / 10.0),  # Convert 0-10 to 0.0-1.0
-            "random_speed": float(max(0, min(10, int(random_speed_raw))) / 10.0),  # Convert 0-10 to 0.0-1.0
-            "auto_home_delay": float(max(0, min(10, int(auto_home_delay_raw)))),  # Clamp to 0-10 seconds
-            "auto_home_duration": float(max(0, min(10, int(auto_home_duration_raw)))),  # Clamp to 0-10 seconds
-            "smart_limit": bool(get_plugin_setting('smart_limit', True)),
-        }
+def build_base_params(overwrite_override: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Build the processing parameters shared by every scene in a run.
+    Only vr_mode differs between scenes; see build_scene_params.
+    """
+    # Build processing parameters from plugin settings (with config file fallback)
+    # Convert 0-10 integer settings to their actual decimal values
+    detrend_window_raw = get_plugin_setting('detrend_window', 2)  # Default: 2 (was 1.5)
+    norm_window_raw = get_plugin_setting('norm_window', 4)  # Default: 4 (was 4.0)
+    multi_axis_intensity_raw = get_plugin_setting('multi_axis_intensity', 5)  # Default: 5 (was 0.5, scale 0-10)
+    random_speed_raw = get_plugin_setting('random_speed', 3)  # Default: 3 (was 0.3, scale 0-10)
+    auto_home_delay_raw = get_plugin_setting('auto_home_delay', 1)  # Default: 1 (was 1.0)
+    auto_home_duration_raw = get_plugin_setting('auto_home_duration', 1)  # Default: 1 (was 0.5, rounded)
+
+    overwrite_flag = bool(get_plugin_setting('overwrite', False)) if overwrite_override is None else bool(overwrite_override)
+
+    return {
+        "threads": int(get_plugin_setting('threads', os.cpu_count() or 4)),
+        "detrend_window": float(max(1, min(10, int(detrend_window_raw)))),  # Clamp to 1-10 seconds
+        "norm_window": float(max(1, min(10, int(norm_window_raw)))),  # Clamp to 1-10 seconds
+        "batch_size": int(get_plugin_setting('batch_size', 3000)),
+        "overwrite": overwrite_flag,
+        "keyframe_reduction": bool(get_plugin_setting('keyframe_reduction', True)),
+        "vr_mode": False,
+        "pov_mode": bool(get_plugin_setting('pov_mode', False)),
+        "balance_global": bool(get_plugin_setting('balance_global', True)),
+        "multi_axis": bool(get_plugin_setting('multi_axis', False)),
+        "multi_axis_intensity": float(max(0, min(10, int(multi_axis_intensity_raw))) / 10.0),  # Convert 0-10 to 0.0-1.0
+        "random_speed": float(max(0, min(10, int(random_speed_raw))) / 10.0),  # Convert 0-10 to 0.0-1.0
+        "auto_home_delay": float(max(0, min(10, int(auto_home_delay_raw)))),  # Clamp to 0-10 seconds
+        "auto_home_duration": float(max(0, min(10, int(auto_home_duration_raw)))),  # Clamp to 0-10 seconds
+        "smart_limit": bool(get_plugin_setting('smart_limit', True)),
+    }
+
+
+def build_scene_params(task: SceneTask, base_params: Dict[str, Any]) -> Dict[str, Any]:
+    """Build processing parameters for a scene from the run's base parameters."""
+    params = dict(base_params)
+    params["vr_mode"] = task.vr_mode
+    return params
+
+
+def get_concurrency() -> int:
+    """Get the number of scenes to process in parallel."""
+    try:
+        return max(1, int(get_plugin_setting('concurrency', 1)))
+    except (TypeError, ValueError):
+        return 1
 
-        log.info(f"Processing scene {scene_id}: {video_path}")
 
-        def progress_cb(prog: int) -> None:
-            scene_progress = prog / 100.0
-            overall_progress = (completed_tasks + scene_progress) / total_tasks
-            log.progress(overall_progress)
+def finish_scene(scene_id: str, error: bool, trigger_tag: Optional[str] = None) -> None:
+    """Apply result tags and markers to a scene after processing."""
+    add_tag_ids = []
+    remove_tag_ids = []
 
+    if error:
+        log.error(f"Error processing scene {scene_id}")
+        error_tag_id = get_tag_id(get_error_tag(), create=True)
+        if error_tag_id:
+            add_tag_ids.append(error_tag_id)
+    else:
+        log.info(f"Successfully processed scene {scene_id}")
+
+        # Add completion tag if configured
+        complete_tag = get_complete_tag()
+        if complete_tag:
+            complete_tag_id = get_tag_id(complete_tag, create=True)
+            if complete_tag_id:
+                add_tag_ids.append(complete_tag_id)
+
+        # Add scene marker if configured
+        if get_plugin_setting('add_marker', True):
+            add_scene_marker(scene_id, "Funscript Generated", 0, "Funscript")
+
+    # Remove trigger tag if requested
+    if trigger_tag:
+        trigger_tag_id = get_tag_id(trigger_tag, create=False)
+        if trigger_tag_id:
+            remove_tag_ids.append(trigger_tag_id)
+
+    update_scene_tags(scene_id, add_tag_ids, remove_tag_ids)
+
+
+def prepare_scene_task(scene: Dict[str, Any]) -> Optional[SceneTask]:
+    """Build the SceneTask for a scene, or return None if it cannot be processed."""
+    scene_id = scene["id"]
+    video_path = get_scene_file_path(scene)
+
+    if not video_path:
+        log.error(f"No file path for scene {scene_id}")
+        return None
+
+    if not os.path.exists(video_path):
+        log.error(f"Video file not found: {video_path}")
+        return None
+
+    return SceneTask(
+        scene_id=scene_id,
+        video_path=video_path,
+        # Same path process_video writes to
+        funscript_path=os.path.splitext(video_path)[0] + ".funscript",
+        vr_mode=is_vr_scene(scene),
+    )
+
+
+# Directory -> names of .funscript files in it, listed once per directory per run
+_funscript_dir_cache: Dict[str, Set[str]] = {}
+
+
+def funscript_exists(funscript_path: str) -> bool:
+    """Check for a funscript using a cached os.scandir listing of its directory."""
+    dir_path, name = os.path.split(funscript_path)
+    names = _funscript_dir_cache.get(dir_path)
+    if names is None:
         try:
-            error = process_video(
-                video_path,
-                params,
-                log.info,
-                progress_callback=progress_cb
-            )
+            with os.scandir(dir_path or ".") as entries:
+                names = {e.name for e in entries if e.name.endswith(".funscript")}
+        except OSError:
+            return os.path.exists(funscript_path)
+        _funscript_dir_cache[dir_path] = names
+    return name in names
+
+
+def remember_funscript(funscript_path: str) -> None:
+    """Record a newly written funscript in the directory cache."""
+    dir_path, name = os.path.split(funscript_path)
+    if dir_path in _funscript_dir_cache:
+        _funscript_dir_cache[dir_path].add(name)
+
+
+def should_skip_scene(task: SceneTask, params: Dict[str, Any]) -> bool:
+    """Check whether a scene already has a funscript and overwrite is off."""
+    if params.get("overwrite", False):
+        return False
+    if funscript_exists(task.funscript_path):
+        log.info(f"Skipping: output file exists ({task.funscript_path})")
+        return True
+    return False
 
-            if error:
-                log.error(f"Error processing scene {scene_id}")
-                add_tag_to_scene(scene_id, get_error_tag())
-            else:
-                log.info(f"Successfully processed scene {scene_id}")
 
-                # Add completion tag if configured
-                complete_tag = get_complete_tag()
-                if complete_tag:
-                    add_tag_to_scene(scene_id, complete_tag)
+async def _run_scene_in_process(task: SceneTask, params: Dict[str, Any]) -> bool:
+    """
+    Run process_video for one scene in this process, reporting per-batch progress.
+    Blocks the event loop until the video is done, so only used with concurrency 1.
+    Returns True if an error occurred, False otherwise.
+    """
+    def progress_cb(prog: int) -> None:
+        scene_progress = prog / 100.0
+        overall_progress = (completed_tasks + scene_progress) / total_tasks
+        report_progress(overall_progress)
+
+    return process_video(task.video_path, params, log.info, progress_callback=progress_cb)
+
+
+async def _run_scene_worker(task: SceneTask, params: Dict[str, Any]) -> bool:
+    """
+    Run process_video for one scene in a child interpreter.
+    Each worker gets its own process so decoder environment variables and
+    multiprocessing pools are not shared between scenes.
+    Returns True if an error occurred, False otherwise.
+    """
+    worker_input = {
+        "server_connection": {"PluginDir": PLUGIN_DIR},
+        "args": {"mode": "process_video", "video_path": task.video_path, "params": params},
+    }
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable,
+        SCRIPT_PATH,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        # Worker log lines go straight to Stash through the inherited stderr
+        stderr=None,
+    )
+    try:
+        out, _ = await proc.communicate(json.dumps(worker_input).encode("utf-8"))
+    except asyncio.CancelledError:
+        # Don't leave an orphaned worker writing a funscript nobody will tag
+        proc.kill()
+        await proc.wait()
+        raise
+    if proc.returncode != 0:
+        return True
+    lines = out.decode("utf-8", "replace").strip().splitlines()
+    try:
+        result = json.loads(lines[-1]) if lines else {}
+    except json.JSONDecodeError:
+        return True
+    return result.get("output") != "ok"
+
+
+async def _process_scene(
+    scene: Dict[str, Any],
+    base_params: Dict[str, Any],
+    trigger_tag: Optional[str],
+    run_video: Callable[[SceneTask, Dict[str, Any]], Awaitable[bool]],
+    call_stash: Callable[..., Awaitable[Any]],
+) -> None:
+    """
+    Per-scene pipeline shared by sequential and parallel processing:
+    prepare, skip check, run_video, then result tagging through call_stash.
+    """
+    task = prepare_scene_task(scene)
+    if not task:
+        return
+
+    params = build_scene_params(task, base_params)
+    try:
+        if should_skip_scene(task, params):
+            error = False
+        else:
+            log.info(f"Processing scene {task.scene_id}: {task.video_path}")
+            error = await run_video(task, params)
+            if not error:
+                remember_funscript(task.funscript_path)
+        await call_stash(finish_scene, task.scene_id, error, trigger_tag)
+    except Exception as e:
+        log.error(f"Exception processing scene {task.scene_id}: {e}")
+        await call_stash(add_tag_to_scene, task.scene_id, get_error_tag())
+
+
+async def _process_scenes_async(
+    scenes: Iterable[Dict[str, Any]],
+    base_params: Dict[str, Any],
+    trigger_tag: Optional[str],
+    concurrency: int,
+    run_video: Callable[[SceneTask, Dict[str, Any]], Awaitable[bool]],
+) -> None:
+    """
+    Process scenes with up to `concurrency` scenes running at once.
+    A producer feeds scenes through a bounded queue while blocking Stash calls
+    (page fetches, tag updates) run on a single executor thread, so fetching the
+    next page or tagging a finished scene overlaps with scenes still running,
+    while the shared Stash session and tag cache are only used by one thread.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    scene_iter = iter(scenes)
+    stash_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
 
-                # Add scene marker if configured
-                if get_plugin_setting('add_marker', True):
-                    add_scene_marker(scene_id, "Funscript Generated", 0, "Funscript")
+    async def call_stash(func: Callable, *args: Any) -> Any:
+        return await loop.run_in_executor(stash_executor, func, *args)
 
-            # Remove trigger tag if requested
-            if trigger_tag:
-                remove_tag_from_scene(scene_id, trigger_tag)
+    fetch_error: List[BaseException] = []
 
+    async def producer() -> None:
+        try:
+            while True:
+                scene = await call_stash(next, scene_iter, None)
+                if scene is None:
+                    break
+                await queue.put(scene)
         except Exception as e:
-            log.error(f"Exception processing scene {scene_id}: {e}")
-            add_tag_to_scene(scene_id, get_error_tag())
+            # Stop feeding new scenes but let the workers finish the ones they have
+            log.error(f"Could not fetch more scenes: {e}")
+            fetch_error.append(e)
+        finally:
+            for _ in range(concurrency):
+                await queue.put(None)
+
+    async def worker() -> None:
+        global completed_tasks
+        while True:
+            scene = await queue.get()
+            if scene is None:
+                return
+
+            try:
+                await _process_scene(scene, base_params, trigger_tag, run_video, call_stash)
+            except Exception as e:
+                # Keep the worker alive so the queue keeps draining
+                log.error(f"Could not process scene {scene.get('id')}: {e}")
+
+            completed_tasks += 1
+            report_progress(completed_tasks / total_tasks)
+
+    try:
+        await asyncio.gather(producer(), *(worker() for _ in range(concurrency)))
+    finally:
+        stash_executor.shutdown(wait=True)
+
+    if fetch_error:
+        raise fetch_error[0]
+
+
+def process_scenes(
+    scenes: Iterable[Dict[str, Any]],
+    overwrite_override: Optional[bool] = None,
+    trigger_tag: Optional[str] = None,
+    total: Optional[int] = None,
+) -> None:
+    """Process a list (or iterator, with `total` given) of scenes."""
+    global total_tasks, completed_tasks
+
+    total_tasks = len(scenes) if total is None else total
+    if not total_tasks:
+        log.info("No scenes found to process")
+        return
 
-        completed_tasks += 1
-        log.progress(completed_tasks / total_tasks)
+    completed_tasks = 0
+    _funscript_dir_cache.clear()
+    log.info(f"Found {total_tasks} scenes to process")
+    report_progress(0.0)
+
+    # Look up every tag this run may touch in one request; missing result tags
+    # are created by finish_scene the first time a scene needs them
+    marker_tag = "Funscript" if get_plugin_setting('add_marker', True) else None
+    resolve_tag_ids([trigger_tag, get_complete_tag(), get_error_tag(), marker_tag])
+    base_params = build_base_params(overwrite_override)
+
+    concurrency = get_concurrency()
+    if concurrency > 1:
+        log.info(f"Processing up to {concurrency} scenes in parallel")
+        run_video = _run_scene_worker
+    else:
+        run_video = _run_scene_in_process
+    asyncio.run(_process_scenes_async(scenes, base_params, trigger_tag, concurrency, run_video))
 
     log.info(f"Completed processing {total_tasks} scenes")
-    log.progress(1.0)
+    report_progress(1.0)
 
 
 def process_tagged_scenes() -> None:
@@ -1754,23 +2143,61 @@ def process_tagged_scenes() -> None:
 
 def process_all_scenes(overwrite: Optional[bool] = None) -> None:
     """Process all scenes in the library."""
-    scenes = get_all_scenes()
-    process_scenes(scenes, overwrite_override=overwrite, trigger_tag=None)
+    if overwrite is None:
+        overwrite = bool(get_plugin_setting('overwrite', False))
+    # Opt-in: Stash flags scenes as interactive when it finds a funscript next to
+    # the video at scan time, so the server can drop those when skipping existing.
+    # This trusts the last scan - a funscript deleted since then is not noticed
+    # until the next scan. Funscripts written since the last scan are still
+    # caught by should_skip_scene.
+    use_scan_state = bool(get_plugin_setting('skip_by_scan_state', False))
+    scene_filter = {"interactive": False} if use_scan_state and not overwrite else {}
+    count, scenes = get_all_scenes(scene_filter=scene_filter)
+    process_scenes(scenes, overwrite_override=overwrite, trigger_tag=None, total=count)
+
+
+# Lines of command output kept for error messages
+OUTPUT_TAIL_LINES = 50
 
 
-def install_python_deps(allow_system_pip: bool) -> None:
+async def _run_command(cmd: List[str]) -> Tuple[int, str]:
+    """
+    Run a command, reading its output line by line.
+    Only the last OUTPUT_TAIL_LINES lines are kept for error messages, so memory
+    stays bounded however verbose the command is.
+    Returns (returncode, tail of combined stdout/stderr output).
+    """
+    _get_log().info(f"Running: {' '.join(cmd)}")
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        limit=1024 * 1024,
+    )
+    lines = collections.deque(maxlen=OUTPUT_TAIL_LINES)
+    async for raw in proc.stdout:
+        line = raw.decode("utf-8", "replace").rstrip()
+        if line:
+            lines.append(line)
+    returncode = await proc.wait()
+    return returncode, "\n".join(lines)
+
+
+async def install_python_deps(allow_system_pip: bool) -> None:
     """Install required Python dependencies using pip."""
-    logger = _get_log()
     if not PLUGIN_DIR:
         raise RuntimeError("Plugin directory not set")
     venv_dir = os.path.join(PLUGIN_DIR, ".venv")
     venv_pip = os.path.join(venv_dir, "bin", "pip")
 
-    cmd_venv = [sys.executable, "-m", "venv", venv_dir]
-    logger.info(f"Running: {' '.join(cmd_venv)}")
-    proc_venv = subprocess.run(cmd_venv, capture_output=True, text=True)
-    if proc_venv.returncode != 0:
-        err = proc_venv.stderr.strip() or proc_venv.stdout.strip() or "unknown error"
+    # Reuse an existing venv instead of re-running `python -m venv` every install
+    if os.path.isfile(venv_pip):
+        returncode, output = 0, ""
+    else:
+        cmd_venv = [sys.executable, "-m", "venv", venv_dir]
+        returncode, output = await _run_command(cmd_venv)
+    if returncode != 0:
+        err = output.strip() or "unknown error"
         if not allow_system_pip:
             raise RuntimeError(f"venv create failed: {err}")
         cmd = [
@@ -1778,31 +2205,31 @@ def install_python_deps(allow_system_pip: bool) -> None:
             "-m",
             "pip",
             "install",
+            "--disable-pip-version-check",
             "--break-system-packages",
             "stashapp-tools",
             "numpy",
             "opencv-python",
             "decord",
         ]
-        logger.info(f"Running: {' '.join(cmd)}")
-        proc = subprocess.run(cmd, capture_output=True, text=True)
-        if proc.returncode != 0:
-            err = proc.stderr.strip() or proc.stdout.strip() or "unknown error"
+        returncode, output = await _run_command(cmd)
+        if returncode != 0:
+            err = output.strip() or "unknown error"
             raise RuntimeError(f"pip install failed: {err}")
         return
 
     cmd = [
         venv_pip,
         "install",
+        "--disable-pip-version-check",
         "stashapp-tools",
         "numpy",
         "opencv-python",
         "decord",
     ]
-    logger.info(f"Running: {' '.join(cmd)}")
-    proc = subprocess.run(cmd, capture_output=True, text=True)
-    if proc.returncode != 0:
-        err = proc.stderr.strip() or proc.stdout.strip() or "unknown error"
+    returncode, output = await _run_command(cmd)
+    if returncode != 0:
+        err = output.strip() or "unknown error"
         raise RuntimeError(f"pip install failed: {err}")
 
     for path in _venv_site_paths(venv_dir):
@@ -1835,15 +2262,17 @@ def run(json_input: Dict[str, Any], output: Dict[str, Any]) -> None:
     global PLUGIN_DIR
     settings = json_input.get("settings") or {}
     try:
-        PLUGIN_DIR = json_input["server_connection"].get("PluginDir")
+        plugin_dir = json_input["server_connection"].get("PluginDir")
     except Exception:
-        PLUGIN_DIR = None
+        plugin_dir = None
+    # Resolve once; everything below (venv paths, chdir, workers) reuses it
+    PLUGIN_DIR = os.path.abspath(plugin_dir) if plugin_dir else None
     plugin_args = args.get("mode")
 
     if plugin_args == "install_deps":
         try:
             allow_system = bool(args.get("allow_system_pip", settings.get("allow_system_pip", False)))
-            install_python_deps(allow_system)
+            asyncio.run(install_python_deps(allow_system))
             output["output"] = "ok"
         except Exception as e:
             output["error"] = str(e)
@@ -1853,10 +2282,17 @@ def run(json_input: Dict[str, Any], output: Dict[str, Any]) -> None:
     if dep_error:
         output["error"] = dep_error
         return
+
+    if plugin_args == "process_video":
+        # Worker mode used by parallel processing: one video, no Stash connection
+        error = process_video(args["video_path"], args["params"], _get_log().info)
+        output["output"] = "error" if error else "ok"
+        return
+
     try:
         logger = _get_log()
         logger.debug(json_input["server_connection"])
-        os.chdir(json_input["server_connection"]["PluginDir"])
+        os.chdir(PLUGIN_DIR)
         initialize_stash(json_input["server_connection"])
     except Exception as e:
         logger.error(f"Failed to initialize: {e}")
@@ -24,6 +24,11 @@ vr_tag_names = ["VR", "Virtual Reality", "180°", "360°"]
 import os
 threads = os.cpu_count() or 4
 
+# Number of scenes to process in parallel (default: 1)
+# Each parallel scene runs in its own process with its own `threads` workers,
+# so lower `threads` when raising this
+concurrency = 1
+
 # Detrend window - controls drift removal aggressiveness (integer 1-10)
 # Higher values work better for stable cameras (recommended: 1-10)
 # Note: StashApp UI only accepts integers 0-10
@@ -40,6 +45,12 @@ batch_size = 3000
 # Overwrite existing funscript files
 overwrite = False
 
+# When skipping existing funscripts, ask Stash for scenes it did not mark as
+# interactive at its last scan instead of listing every scene.
+# Faster on large libraries, but depends on a recent scan: a funscript deleted
+# since the last scan is not regenerated until the library is rescanned
+skip_by_scan_state = False
+
 # Enable keyframe reduction (reduces file size while maintaining quality)
 keyframe_reduction = True
 